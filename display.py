@@ -2,12 +2,12 @@ import serial
 import time
 import pynmea2
 import threading
+import queue
 import matplotlib.pyplot as plt
 import numpy as np
 import matplotlib.animation as animation
 from fastestrplidar import FastestRplidar
 import smbus2
-from collections import deque
 import logging
 import signal
 import sys
@@ -40,6 +40,7 @@ class SensorFusion:
         LIDAR_PORT = '/dev/ttyUSB0'
         LIDAR_DMAX = 4000      # Maximum LiDAR distance
         LIDAR_SCAN_MODE = 0    # Scan mode (0-2)
+        LIDAR_MAX_POINTS = 4096  # Capacity of each preallocated scan buffer
         
         # Modified: Changed to capture the specific 90-degree cone (315-360 and 0-45 degrees)
         LIDAR_MIN_ANGLE = -45  # Minimum display angle (converted from 315° to -45° for polar plot)
@@ -60,6 +61,12 @@ class SensorFusion:
         # Folium map settings - Using absolute path in home directory
         MAP_HTML_PATH = os.path.join(str(Path.home()), "gps_position.html")
         MAP_ZOOM_START = 15
+        
+        # Placeholder fix used to render the GPS map page once; later updates
+        # only substitute the current values into the cached HTML
+        MAP_TEMPLATE_LAT = 12.3456789
+        MAP_TEMPLATE_LON = -98.7654321
+        MAP_TEMPLATE_POPUP = "__GPS_POPUP__"
     
     def __init__(self):
         self.config = self.Config()
@@ -68,15 +75,37 @@ class SensorFusion:
         logger.info(f"Starting SensorFusion - User: {self.config.USER_LOGIN}, Session start: {self.config.SYSTEM_START_TIME}")
         
         # Data structures with thread safety
-        self.lidar_data_lock = threading.Lock()
-        self.lidar_data = []
-        
-        self.accel_data_lock = threading.Lock()
-        self.accel_data = deque(maxlen=self.config.MAX_DATA_POINTS)
+        # Two preallocated sets of plot offsets and intensities: the LiDAR
+        # thread fills the inactive set and publishes it with a single
+        # reference assignment, so readers need no lock
+        self._lidar_bufs = [
+            np.empty((self.config.LIDAR_MAX_POINTS, 2), dtype=np.float32),
+            np.empty((self.config.LIDAR_MAX_POINTS, 2), dtype=np.float32)
+        ]
+        self._lidar_intensity_bufs = [
+            np.empty(self.config.LIDAR_MAX_POINTS, dtype=np.float32),
+            np.empty(self.config.LIDAR_MAX_POINTS, dtype=np.float32)
+        ]
+        self._lidar_active = 0
+        # Views (offsets, intensity) of the current scan
+        self.lidar_data = (self._lidar_bufs[0][:0], self._lidar_intensity_bufs[0][:0])
+        
+        # Preallocated ring buffer instead of a deque of Python floats;
+        # _accel_count is the total number of samples written so far and
+        # _accel_seq is odd while a sample is being written (seqlock)
+        self.accel_data = np.zeros(self.config.MAX_DATA_POINTS, dtype=np.float32)
+        self._accel_count = 0
+        self._accel_seq = 0
+        self._accel_plot_data = np.full(self.config.MAX_DATA_POINTS, np.nan, dtype=np.float32)
         
         self.gps_data_lock = threading.Lock()
         self.gps_data = {"timestamp": None, "lat": 0, "lon": 0, "alt": 0, "sats": 0}
-        self.last_map_update = 0
+        self.next_map_update = 0  # time.monotonic() deadline for the next map update
+        
+        # Scale factor from LiDAR distance to plot intensity
+        self.lidar_intensity_scale = 50.0 / self.config.LIDAR_DMAX
+        self.map_queue = queue.Queue(maxsize=1)  # Pending map updates for the map thread
+        self.gps_map_template = None  # Rendered map HTML with placeholder values
         
         # Device handles
         self.lidar_device = None
@@ -168,13 +197,21 @@ class SensorFusion:
 
     def read_word(self, addr, reg):
         """Read a word from the I2C device"""
-        high = self.read_byte(addr, reg)
-        low = self.read_byte(addr, reg + 1)
-        if high is not None and low is not None:
-            val = (high << 8) + low
-            return val
-        else:
-            return None
+        # Read the high and low bytes in one combined transaction instead of
+        # two separate byte reads
+        retries = 3
+        for _ in range(retries):
+            try:
+                write = smbus2.i2c_msg.write(addr, [reg])
+                read = smbus2.i2c_msg.read(addr, 2)
+                self.i2c_bus.i2c_rdwr(write, read)
+                high, low = list(read)
+                return (high << 8) + low
+            except Exception as e:
+                logger.debug(f"Error reading word from address 0x{addr:02x}, register 0x{reg:02x}: {e}")
+                time.sleep(0.01)
+        logger.warning(f"Failed to read from address 0x{addr:02x}, register 0x{reg:02x} after {retries} retries")
+        return None
 
     def read_word_2c(self, addr, reg):
         """Read a 2's complement word from the I2C device"""
@@ -196,16 +233,35 @@ class SensorFusion:
 
     def filter_lidar_angles(self, scan_data):
         """Filter LiDAR data to only include points within specified angle ranges"""
-        filtered_data = []
-        
-        for point in scan_data:
-            angle = point[0]
-            for angle_range in self.config.LIDAR_FILTER_ANGLES:
-                if angle_range[0] <= angle <= angle_range[1]:
-                    filtered_data.append(point)
-                    break
+        # Convert the scan once so the angle test runs as vectorized comparisons
+        scan = np.asarray(scan_data, dtype=np.float32)
+        if scan.ndim != 2 or len(scan) == 0:
+            return np.empty((0, 2), dtype=np.float32)
+        
+        angles = scan[:, 0]
+        mask = np.zeros(len(scan), dtype=bool)
+        for angle_range in self.config.LIDAR_FILTER_ANGLES:
+            mask |= (angles >= angle_range[0]) & (angles <= angle_range[1])
                     
-        return filtered_data
+        return scan[mask, :2]
+
+    def prepare_lidar_points(self, scan_data, offsets, intensity):
+        """Filter a LiDAR scan into preallocated plot offsets and intensities, returning the point count"""
+        points = self.filter_lidar_angles(scan_data)
+        n = min(len(points), len(offsets))
+        
+        # Convert 315-360 degrees to -45-0 degrees, then to radians, directly
+        # in the output buffer
+        angles = offsets[:n, 0]
+        angles[:] = points[:n, 0]
+        angles[angles >= 315] -= 360
+        np.radians(angles, out=angles)
+        
+        # Color by intensity/distance
+        offsets[:n, 1] = points[:n, 1]
+        np.multiply(offsets[:n, 1], self.lidar_intensity_scale, out=intensity[:n])
+        
+        return n
 
     def lidar_thread_func(self):
         """Thread function for LiDAR data acquisition"""
@@ -215,12 +271,18 @@ class SensorFusion:
                 # Fetch the LiDAR scan data
                 scan_data = self.lidar_device.get_scan_as_vectors(filter_quality=True)
                 
-                # Filter data based on angles
-                filtered_data = self.filter_lidar_angles(scan_data)
+                # Filter data based on angles and convert it for the polar
+                # plot once per scan, straight into the inactive buffers
+                back = 1 - self._lidar_active
+                n = self.prepare_lidar_points(
+                    scan_data, self._lidar_bufs[back], self._lidar_intensity_bufs[back]
+                )
                 
-                # Update shared data with lock
-                with self.lidar_data_lock:
-                    self.lidar_data = filtered_data
+                # Publish them as the current scan. The reference assignment is
+                # atomic, and the buffers a reader holds are not written again
+                # until the scan after next
+                self._lidar_active = back
+                self.lidar_data = (self._lidar_bufs[back][:n], self._lidar_intensity_bufs[back][:n])
                     
             except Exception as e:
                 logger.error(f"Error in LiDAR thread: {e}")
@@ -236,10 +298,12 @@ class SensorFusion:
         while not self.stop_event.is_set():
             try:
                 # Fetch the GPS data
-                raw_data = self.gps_serial_port.readline().decode().strip()
+                raw_data = self.gps_serial_port.readline()
                 
-                if raw_data.find('GGA') > 0:
-                    gps_message = pynmea2.parse(raw_data)
+                # Check the sentence type ($xxGGA) on the raw bytes so other
+                # sentences are dropped without being decoded
+                if raw_data[3:6] == b'GGA':
+                    gps_message = pynmea2.parse(raw_data.decode('ascii', 'ignore').strip())
                     
                     # Update shared data with lock
                     with self.gps_data_lock:
@@ -250,12 +314,21 @@ class SensorFusion:
                             "alt": gps_message.altitude,
                             "sats": gps_message.num_sats
                         }
+                        gps_data = self.gps_data
                     
                     # Check if it's time to update the map
-                    current_time = time.time()
-                    if current_time - self.last_map_update >= self.config.GPS_MAP_UPDATE_INTERVAL:
-                        self.update_gps_map()
-                        self.last_map_update = current_time
+                    current_time = time.monotonic()
+                    if current_time >= self.next_map_update:
+                        # Hand the fix to the map thread so rendering the map never
+                        # stalls the serial reads. Each fix is a new dict, so it is
+                        # passed without a copy. A pending update that has not been
+                        # rendered yet is replaced by this newer fix
+                        try:
+                            self.map_queue.get_nowait()
+                        except queue.Empty:
+                            pass
+                        self.map_queue.put_nowait(gps_data)
+                        self.next_map_update = current_time + self.config.GPS_MAP_UPDATE_INTERVAL
                     
                     logger.info(f"GPS: {self.gps_data}")
                     
@@ -267,25 +340,75 @@ class SensorFusion:
             
         logger.info("GPS thread stopped")
 
-    def update_gps_map(self):
+    def map_thread_func(self):
+        """Thread function for rendering the GPS map off the GPS thread"""
+        logger.info("Map thread started")
+        while not self.stop_event.is_set():
+            try:
+                gps_data = self.map_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+                
+            self.update_gps_map(gps_data)
+            
+        logger.info("Map thread stopped")
+
+    def build_gps_map(self, lat, lon, popup_text):
+        """Create a Folium map showing a single GPS fix"""
+        # Create a map centered at the GPS coordinates
+        m = folium.Map(location=[lat, lon], zoom_start=self.config.MAP_ZOOM_START)
+        
+        # Add a marker for the current position
+        folium.Marker(
+            [lat, lon], 
+            popup=folium.Popup(popup_text, max_width=300)
+        ).add_to(m)
+        
+        # Add a circle to show accuracy (just for visualization)
+        folium.Circle(
+            location=[lat, lon],
+            radius=10,  # 10 meters radius
+            color='blue',
+            fill=True,
+            fill_opacity=0.2
+        ).add_to(m)
+        
+        return m
+
+    def get_gps_map_template(self):
+        """Render the GPS map page once with placeholder values and cache the HTML"""
+        if self.gps_map_template is None:
+            m = self.build_gps_map(
+                self.config.MAP_TEMPLATE_LAT, 
+                self.config.MAP_TEMPLATE_LON, 
+                self.config.MAP_TEMPLATE_POPUP
+            )
+            html = m.get_root().render()
+            
+            # Fall back to rebuilding the map if the placeholders did not survive rendering
+            placeholders = (self.config.MAP_TEMPLATE_LAT, self.config.MAP_TEMPLATE_LON, self.config.MAP_TEMPLATE_POPUP)
+            if all(str(value) in html for value in placeholders):
+                self.gps_map_template = html
+            else:
+                logger.warning("Map template placeholders not found, rebuilding the map on every update")
+                self.gps_map_template = ""
+        return self.gps_map_template
+
+    def update_gps_map(self, gps_data):
         """Update the GPS position on a Folium map and save as HTML"""
         try:
-            with self.gps_data_lock:
-                lat = self.gps_data["lat"]
-                lon = self.gps_data["lon"]
-                alt = self.gps_data["alt"]
-                sats = self.gps_data["sats"]
-                timestamp = self.gps_data["timestamp"]
+            # gps_data is a fix snapshot that is never modified, so no lock is needed
+            lat = gps_data["lat"]
+            lon = gps_data["lon"]
+            alt = gps_data["alt"]
+            sats = gps_data["sats"]
+            timestamp = gps_data["timestamp"]
             
             # Skip if we don't have valid coordinates yet
             if lat == 0 and lon == 0:
                 logger.warning("No valid GPS coordinates yet, skipping map update")
                 return
                 
-            # Create a map centered at the GPS coordinates
-            m = folium.Map(location=[lat, lon], zoom_start=self.config.MAP_ZOOM_START)
-            
-            # Add a marker for the current position
             popup_text = f"""
             <b>GPS Data</b><br>
             Latitude: {lat:.6f}°<br>
@@ -298,22 +421,16 @@ class SensorFusion:
             Session: {self.config.SYSTEM_START_TIME}
             """
             
-            folium.Marker(
-                [lat, lon], 
-                popup=folium.Popup(popup_text, max_width=300)
-            ).add_to(m)
-            
-            # Add a circle to show accuracy (just for visualization)
-            folium.Circle(
-                location=[lat, lon],
-                radius=10,  # 10 meters radius
-                color='blue',
-                fill=True,
-                fill_opacity=0.2
-            ).add_to(m)
-            
-            # Save the map to an HTML file
-            m.save(self.config.MAP_HTML_PATH)
+            # Fill the cached page instead of rebuilding the whole Folium map
+            template = self.get_gps_map_template()
+            if template:
+                html = (template.replace(str(self.config.MAP_TEMPLATE_LAT), str(lat))
+                                .replace(str(self.config.MAP_TEMPLATE_LON), str(lon))
+                                .replace(self.config.MAP_TEMPLATE_POPUP, popup_text))
+                with open(self.config.MAP_HTML_PATH, 'w', encoding='utf-8') as f:
+                    f.write(html)
+            else:
+                self.build_gps_map(lat, lon, popup_text).save(self.config.MAP_HTML_PATH)
             logger.info(f"GPS map updated at {self.config.MAP_HTML_PATH}")
             
             # Verify the file exists
@@ -361,9 +478,12 @@ class SensorFusion:
                 accel_z = self.get_accel_data()
                 
                 if accel_z is not None:
-                    # Update shared data with lock
-                    with self.accel_data_lock:
-                        self.accel_data.append(accel_z)
+                    # Update shared data; the sequence number lets the plot
+                    # detect and retry a read that overlapped this write
+                    self._accel_seq += 1
+                    self.accel_data[self._accel_count % self.config.MAX_DATA_POINTS] = accel_z
+                    self._accel_count += 1
+                    self._accel_seq += 1
                     
                     logger.debug(f"Accelerometer: Z={accel_z:.2f}g")
                     
@@ -377,54 +497,52 @@ class SensorFusion:
 
     def update_lidar_plot(self, num, line):
         """Update function for LiDAR animation"""
-        with self.lidar_data_lock:
-            if not self.lidar_data:
-                return line,
-                
-            # Process the data for visualization - 
-            # Convert angles to the format expected by the polar plot
-            polar_data = []
-            for point in self.lidar_data:
-                angle_deg = point[0]
-                distance = point[1]
-                
-                # Convert 315-360 degrees to -45-0 degrees for the polar plot
-                if angle_deg >= 315 and angle_deg <= 360:
-                    angle_deg = angle_deg - 360
-                
-                # Only include angles in our desired range
-                if -45 <= angle_deg <= 45:
-                    polar_data.append((np.radians(angle_deg), distance))
-            
-            if not polar_data:
-                return line,
-                
-            # Convert data to numpy arrays for faster processing
-            angles = np.array([point[0] for point in polar_data])
-            distances = np.array([point[1] for point in polar_data])
-            
-            # Update the plot
-            offsets = np.column_stack((angles, distances))
-            line.set_offsets(offsets)
-            
-            # Color by intensity/distance
-            intensity = np.array([0 + (50 - 0) * (d / self.config.LIDAR_DMAX) for d in distances])
-            line.set_array(intensity)
+        # Take the current scan by reference; no lock is needed. The LiDAR
+        # thread already converted it to (radians, distance) plot offsets
+        # and intensities
+        offsets, intensity = self.lidar_data
+        if len(offsets) == 0:
+            return line,
+        
+        # Update the plot
+        line.set_offsets(offsets)
+        line.set_array(intensity)
             
         return line,
 
+    def read_accel_samples(self, out):
+        """Copy the accelerometer samples oldest to newest into out without a lock"""
+        size = self.config.MAX_DATA_POINTS
+        while True:
+            seq = self._accel_seq
+            if seq % 2 == 0:
+                count = self._accel_count
+                if count <= size:
+                    out[:count] = self.accel_data[:count]
+                    n = count
+                else:
+                    head = count % size
+                    out[:size - head] = self.accel_data[head:]
+                    out[size - head:] = self.accel_data[:head]
+                    n = size
+                # Retry if a sample was written while copying
+                if self._accel_seq == seq:
+                    return n
+            # Let the accelerometer thread finish its write
+            time.sleep(0)
+
     def update_accel_plot(self, frame, accel_line):
         """Update function for accelerometer animation"""
-        with self.accel_data_lock:
-            if not self.accel_data:
-                return accel_line,
-                
-            # Update the plot with current data
-            data_array = np.array(self.accel_data)
-            accel_line.set_ydata(data_array)
+        if self._accel_count == 0:
+            return accel_line,
+            
+        # Copy the ring buffer into the preallocated plot array. The x-axis
+        # is fixed at setup, so unfilled samples stay NaN (not drawn)
+        # instead of rebuilding the x data each frame
+        n = self.read_accel_samples(self._accel_plot_data)
+        self._accel_plot_data[n:] = np.nan
             
-            # Adjust x-axis for proper scrolling effect
-            accel_line.set_xdata(np.arange(len(data_array)))
+        accel_line.set_ydata(self._accel_plot_data)
             
         return accel_line,
 
@@ -477,6 +595,10 @@ class SensorFusion:
         ax_lidar.grid(True)
         ax_lidar.set_title(f"LiDAR Data (90° FOV: 315°-360° and 0°-45°)\n{user_info}")
         
+        # Freeze the limits so new data never rescales the axes, which would
+        # invalidate the cached blit background
+        ax_lidar.set_autoscale_on(False)
+        
         self.lidar_ani = animation.FuncAnimation(
             self.fig_lidar, 
             self.update_lidar_plot,
@@ -507,9 +629,9 @@ class SensorFusion:
         except Exception as e:
             logger.warning(f"Could not configure window manager for accelerometer plot: {e}")
         
-        # Initialize with empty data
+        # Initialize with empty data; the x data stays fixed, only y is updated
         accel_line, = ax_accel.plot(
-            np.arange(self.config.MAX_DATA_POINTS),
+            np.arange(self.config.MAX_DATA_POINTS, dtype=np.float32),
             np.zeros(self.config.MAX_DATA_POINTS),
             'b-', 
             label='Acceleration (Z)'
@@ -522,6 +644,7 @@ class SensorFusion:
         ax_accel.set_ylabel("Acceleration (g)")
         ax_accel.grid(True)
         ax_accel.legend(loc='upper right')
+        ax_accel.set_autoscale_on(False)
         
         # Add user info text in the lower right corner
         self.fig_accel.text(0.99, 0.01, f"{user_info} | Current time: {current_time}", 
@@ -554,6 +677,14 @@ class SensorFusion:
         except Exception as e:
             logger.error(f"Error opening map in browser: {e}")
 
+    def on_figure_close(self, event):
+        """Stop the application when any plot window is closed"""
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        # Close the other window too so plt.show() returns and cleanup runs
+        plt.close('all')
+
     def signal_handler(self, sig, frame):
         """Handle SIGINT (Ctrl+C) gracefully"""
         logger.info("Shutdown signal received. Cleaning up...")
@@ -626,6 +757,7 @@ class SensorFusion:
         self.threads = [
             threading.Thread(target=self.lidar_thread_func, daemon=True),
             threading.Thread(target=self.gps_thread_func, daemon=True),
+            threading.Thread(target=self.map_thread_func, daemon=True),
             threading.Thread(target=self.accel_thread_func, daemon=True)
         ]
         
@@ -637,14 +769,15 @@ class SensorFusion:
             logger.info("Setting up visualization...")
             self.setup_visualization()
             
+            # Closing a plot window stops data acquisition
+            for fig in (self.fig_lidar, self.fig_accel):
+                fig.canvas.mpl_connect('close_event', self.on_figure_close)
+            
             # Use plt.ioff() to avoid keeping windows always on top
             plt.ioff()
-            # Show the figures but don't block
-            plt.show(block=False)
-            
-            # Keep the main thread alive but responsive to signals
-            while not self.stop_event.is_set():
-                plt.pause(0.1)  # Update plots while allowing other operations
+            # Block in the GUI event loop until the windows are closed; the
+            # animations drive all redraws, so no polling loop is needed
+            plt.show(block=True)
                 
         except Exception as e:
             logger.error(f"Error in visualization: {e}")
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+
+class RingBuffer:
+    """Fixed-size ring buffer for streaming sensor samples"""
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=dtype)
+        self._count = 0  # Total number of samples written so far
+        self._seq = 0  # Odd while an append is in progress (seqlock for readers)
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def count(self):
+        """Total number of samples appended so far"""
+        return self._count
+
+    def append(self, value):
+        """Store a sample, overwriting the oldest one when full"""
+        self._seq += 1
+        self._buf[self._count % self.capacity] = value
+        self._count += 1
+        self._seq += 1
+
+    def copy_into(self, out):
+        """Copy the samples oldest to newest into out, lock-free, and return how many were copied"""
+        while True:
+            seq = self._seq
+            if seq % 2 == 0:
+                count = self._count
+                if count <= self.capacity:
+                    out[:count] = self._buf[:count]
+                    n = count
+                else:
+                    head = count % self.capacity
+                    tail = self.capacity - head
+                    out[:tail] = self._buf[head:]
+                    out[tail:self.capacity] = self._buf[:head]
+                    n = self.capacity
+                # Retry if an append started or finished while copying
+                if self._seq == seq:
+                    return n
+            # Let the writer finish its append
+            time.sleep(0)
+
+class ScanBuffer:
+    """Latest LiDAR scan stored as preallocated float32 angle and distance columns"""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Two sets of columns: readers use the front one while the producer
+        # fills the back one, so a new scan is published with an index swap
+        self._angles = np.zeros((2, capacity), dtype=np.float32)
+        self._distances = np.zeros((2, capacity), dtype=np.float32)
+        self._lengths = [0, 0]
+        self._front = 0
+        self.generation = 0  # Incremented on every new scan
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def length(self):
+        """Number of points in the current scan"""
+        return self._lengths[self._front]
+
+    @property
+    def angles(self):
+        """View of the angles of the current scan"""
+        return self._angles[self._front, :self.length]
+
+    @property
+    def distances(self):
+        """View of the distances of the current scan"""
+        return self._distances[self._front, :self.length]
+
+    def matches(self, points):
+        """Check whether an (N, 2) array holds the same points as the current scan"""
+        return (len(points) == self.length and
+                np.array_equal(points[:, 0], self.angles) and
+                np.array_equal(points[:, 1], self.distances))
+
+    def fill(self, points):
+        """Copy an (N, 2) array of angles and distances into the back buffer"""
+        back = 1 - self._front
+        n = min(len(points), self.capacity)
+        self._angles[back, :n] = points[:n, 0]
+        self._distances[back, :n] = points[:n, 1]
+        self._lengths[back] = n
+
+    def swap(self):
+        """Publish the back buffer as the current scan"""
+        self._front = 1 - self._front
+        self.generation += 1
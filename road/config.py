@@ -5,7 +5,9 @@ class Config:
     # General settings
     MAX_DATA_POINTS = 100  # Maximum data points to store in memory
     UPDATE_INTERVAL = 10   # Visualization update interval in ms
+    VISUALIZATION_BACKEND = "matplotlib"  # "matplotlib" or "pyqtgraph" (optional dependency)
     GPS_MAP_UPDATE_INTERVAL = 10   # GPS map update interval in seconds
+    MAP_MIN_MOVE_METERS = 5   # Skip map updates until the position moved this far
     
     # User and system information
     USER_LOGIN = "David070920"
@@ -15,6 +17,9 @@ class Config:
     LIDAR_PORT = '/dev/ttyUSB0'
     LIDAR_DMAX = 4000      # Maximum LiDAR distance
     LIDAR_SCAN_MODE = 0    # Scan mode (0-2)
+    LIDAR_MAX_POINTS = 4096  # Capacity of the preallocated scan buffer
+    LIDAR_MAX_PLOT_POINTS = 800  # Scans denser than this are decimated before plotting
+    LIDAR_POLL_INTERVAL = 0.05  # Seconds between LiDAR scans
     
     # Modified: Changed to capture the specific 90-degree cone (315-360 and 0-45 degrees)
     LIDAR_MIN_ANGLE = -45  # Minimum display angle (converted from 315° to -45° for polar plot)
@@ -25,12 +30,14 @@ class Config:
     GPS_PORT = '/dev/ttyACM0'
     GPS_BAUD_RATE = 9600
     GPS_TIMEOUT = 0.5
+    GPS_RETRY_INTERVAL = 0.2  # Seconds to back off when the GPS port is missing or failing
     
     # ICM20948 settings
     ICM20948_ADDRESS = 0x69
     ICM20948_WHO_AM_I = 0x00
     ICM20948_PWR_MGMT_1 = 0x06
     ICM20948_ACCEL_ZOUT_H = 0x31
+    ACCEL_POLL_INTERVAL = 0.1  # Seconds between accelerometer samples
     
     # Folium map settings - Using absolute path in home directory
     MAP_HTML_PATH = os.path.join(str(Path.home()), "gps_position.html")
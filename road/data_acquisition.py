@@ -1,23 +1,35 @@
 import time
+import queue
 import threading
 import pynmea2
 import logging
-from utils import get_accel_data  # Import the get_accel_data function
+import numpy as np
+from utils import get_accel_data, haversine_distance
 
 logger = logging.getLogger("SensorFusion")
 
 def filter_lidar_angles(scan_data, config):
-    """Filter LiDAR data to only include points within specified angle ranges"""
-    filtered_data = []
+    """Filter LiDAR data to the specified angle ranges, with angles returned as -180..180 degrees"""
+    # Convert the scan once so the angle test runs as vectorized comparisons
+    scan = np.asarray(scan_data, dtype=np.float32)
+    if scan.ndim != 2 or len(scan) == 0:
+        return np.empty((0, 2), dtype=np.float32)
     
-    for point in scan_data:
-        angle = point[0]
-        for angle_range in config.LIDAR_FILTER_ANGLES:
-            if angle_range[0] <= angle <= angle_range[1]:
-                filtered_data.append(point)
-                break
-                
-    return filtered_data
+    angles = scan[:, 0]
+    mask = np.zeros(len(scan), dtype=bool)
+    for angle_range in config.LIDAR_FILTER_ANGLES:
+        mask |= (angles >= angle_range[0]) & (angles <= angle_range[1])
+    
+    # Drop invalid returns (NaN or zero distance) in the same pass
+    distances = scan[:, 1]
+    mask &= np.isfinite(distances) & (distances > 0)
+    
+    # Convert 315-360 degrees to -45-0 degrees here so consumers can use the
+    # angles for the polar plot without another masking pass
+    filtered = scan[mask, :2]
+    filtered[:, 0] = np.where(filtered[:, 0] >= 180, filtered[:, 0] - 360, filtered[:, 0])
+        
+    return filtered
 
 def lidar_thread_func(lidar_device, lidar_data_lock, lidar_data, stop_event, config):
     """Thread function for LiDAR data acquisition"""
@@ -30,61 +42,101 @@ def lidar_thread_func(lidar_device, lidar_data_lock, lidar_data, stop_event, con
             # Filter data based on angles
             filtered_data = filter_lidar_angles(scan_data, config)
             
-            # Update shared data with lock - Replace data instead of appending
-            with lidar_data_lock:
-                lidar_data.clear()  # Clear old data
-                lidar_data.extend(filtered_data)  # Add new data
+            # A stationary sensor often returns the same scan again; leave the
+            # current one (and its generation) alone so the plots skip redrawing.
+            # Only this thread swaps buffers, so the front one is stable here
+            if not lidar_data.matches(filtered_data):
+                # Copy into the back buffer without the lock (only this thread
+                # writes it), then publish the new scan with a swap under the lock
+                lidar_data.fill(filtered_data)
+                with lidar_data_lock:
+                    lidar_data.swap()
                     
         except Exception as e:
-            logger.error(f"Error in LiDAR thread: {e}")
+            logger.error("Error in LiDAR thread: %s", e)
             
-        # Sleep to prevent high CPU usage
-        time.sleep(0.05)
+        # Wait to prevent high CPU usage, waking immediately on shutdown
+        stop_event.wait(config.LIDAR_POLL_INTERVAL)
     
     logger.info("LiDAR thread stopped")
 
-def gps_thread_func(gps_serial_port, gps_data_lock, gps_data, stop_event, config, update_gps_map, sensor_instance):
+def gps_thread_func(gps_serial_port, gps_data_lock, gps_data, stop_event, config, map_queue, sensor_instance):
     """Thread function for GPS data acquisition"""
     logger.info("GPS thread started")
     while not stop_event.is_set():
         try:
             if gps_serial_port is None:
-                time.sleep(0.2)
+                stop_event.wait(config.GPS_RETRY_INTERVAL)
                 continue
                 
-            # Fetch the GPS data
-            raw_data = gps_serial_port.readline().decode().strip()
+            # Fetch the GPS data - readline blocks for up to GPS_TIMEOUT, so
+            # no extra sleep is needed between sentences
+            raw_data = gps_serial_port.readline()
             
-            if raw_data.find('GGA') > 0:
-                gps_message = pynmea2.parse(raw_data)
+            # Check the sentence type ($xxGGA) on the raw bytes so other
+            # sentences are dropped without being decoded
+            if raw_data[3:6] == b'GGA':
+                gps_message = pynmea2.parse(raw_data.decode('ascii', 'ignore').strip())
+                lat = round(gps_message.latitude, 6)
+                lon = round(gps_message.longitude, 6)
+                
+                # Build the fix outside the lock; it is never modified afterwards,
+                # so it can also be handed to the map thread without a copy
+                gps_fix = {
+                    "timestamp": gps_message.timestamp,
+                    "lat": lat,
+                    "lon": lon,
+                    "alt": gps_message.altitude,
+                    "sats": gps_message.num_sats
+                }
                 
                 # Update shared data with lock
                 with gps_data_lock:
-                    gps_data.update({
-                        "timestamp": gps_message.timestamp,
-                        "lat": round(gps_message.latitude, 6),
-                        "lon": round(gps_message.longitude, 6),
-                        "alt": gps_message.altitude,
-                        "sats": gps_message.num_sats
-                    })
+                    gps_data.update(gps_fix)
                 
                 # Check if it's time to update the map
-                current_time = time.time()
-                if current_time - sensor_instance.last_map_update >= config.GPS_MAP_UPDATE_INTERVAL:
-                    update_gps_map(gps_data, config)
-                    sensor_instance.last_map_update = current_time
+                current_time = time.monotonic()
+                if current_time >= sensor_instance.next_map_update:
+                    # Only regenerate the map once the position has actually moved
+                    last_position = sensor_instance.last_map_position
+                    if (last_position is None or
+                            haversine_distance(last_position[0], last_position[1], lat, lon) >= config.MAP_MIN_MOVE_METERS):
+                        # Hand the map off to the map thread so rendering and writing
+                        # the HTML never stalls NMEA ingest. A pending update that
+                        # has not been rendered yet is replaced by this newer fix
+                        try:
+                            map_queue.get_nowait()
+                        except queue.Empty:
+                            pass
+                        map_queue.put_nowait(gps_fix)
+                        sensor_instance.last_map_position = (lat, lon)
+                    sensor_instance.next_map_update = current_time + config.GPS_MAP_UPDATE_INTERVAL
                 
-                logger.info(f"GPS: {gps_data}")
+                # Per-fix logging is debug only, and only formatted when enabled
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("GPS: %s", gps_data)
                 
         except Exception as e:
-            logger.debug(f"Error in GPS thread: {e}")
-            
-        # Sleep to prevent high CPU usage
-        time.sleep(0.2)
+            logger.debug("Error in GPS thread: %s", e)
+            # Back off so a failing port does not spin the loop
+            stop_event.wait(config.GPS_RETRY_INTERVAL)
         
     logger.info("GPS thread stopped")
 
-def accel_thread_func(i2c_bus, accel_data_lock, accel_data, stop_event, config):
+def map_thread_func(map_queue, stop_event, config, update_gps_map):
+    """Thread function for rendering the GPS map off the acquisition threads"""
+    logger.info("Map thread started")
+    while not stop_event.is_set():
+        try:
+            gps_fix = map_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        
+        update_gps_map(gps_fix, config)
+        
+    logger.info("Map thread stopped")
+
+def accel_thread_func(i2c_bus, accel_data, stop_event, config):
     """Thread function for accelerometer data acquisition"""
     logger.info("Accelerometer thread started")
     while not stop_event.is_set():
@@ -93,16 +145,16 @@ def accel_thread_func(i2c_bus, accel_data_lock, accel_data, stop_event, config):
             accel_z = get_accel_data(i2c_bus, config)
             
             if accel_z is not None:
-                # Update shared data with lock
-                with accel_data_lock:
-                    accel_data.append(accel_z)
+                # Update shared data; readers use the ring buffer's seqlock
+                accel_data.append(accel_z)
                 
-                logger.debug(f"Accelerometer: Z={accel_z:.2f}g")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Accelerometer: Z=%.2fg", accel_z)
                 
         except Exception as e:
-            logger.error(f"Error in accelerometer thread: {e}")
+            logger.error("Error in accelerometer thread: %s", e)
             
-        # Sleep to prevent high CPU usage
-        time.sleep(0.1)
+        # Wait to prevent high CPU usage, waking immediately on shutdown
+        stop_event.wait(config.ACCEL_POLL_INTERVAL)
         
     logger.info("Accelerometer thread stopped")
@@ -13,7 +13,7 @@ def initialize_i2c():
         time.sleep(0.1)
         return i2c_bus
     except Exception as e:
-        logger.error(f"Failed to initialize I2C: {e}")
+        logger.error("Failed to initialize I2C: %s", e)
         return None
 
 def initialize_lidar(config):
@@ -25,7 +25,7 @@ def initialize_lidar(config):
         logger.info("LiDAR initialized successfully")
         return lidar_device
     except Exception as e:
-        logger.error(f"Failed to initialize LiDAR: {e}")
+        logger.error("Failed to initialize LiDAR: %s", e)
         return None
 
 def initialize_gps(config):
@@ -39,7 +39,7 @@ def initialize_gps(config):
         logger.info("GPS initialized successfully")
         return gps_serial_port
     except Exception as e:
-        logger.error(f"Failed to initialize GPS: {e}")
+        logger.error("Failed to initialize GPS: %s", e)
         return None
 
 def initialize_icm20948(i2c_bus, config):
@@ -48,7 +48,7 @@ def initialize_icm20948(i2c_bus, config):
         who_am_i = read_byte(i2c_bus, config.ICM20948_ADDRESS, config.ICM20948_WHO_AM_I)
         
         if who_am_i == 0xEA:
-            logger.info(f"ICM20948 found at address 0x{config.ICM20948_ADDRESS:02x}")
+            logger.info("ICM20948 found at address 0x%02x", config.ICM20948_ADDRESS)
             # Wake up the sensor (clear sleep mode)
             i2c_bus.write_byte_data(
                 config.ICM20948_ADDRESS, 
@@ -58,10 +58,10 @@ def initialize_icm20948(i2c_bus, config):
             time.sleep(0.1)
             return True
         else:
-            logger.error(f"ICM20948 WHO_AM_I register mismatch. Expected 0xEA, got {who_am_i}")
+            logger.error("ICM20948 WHO_AM_I register mismatch. Expected 0xEA, got %s", who_am_i)
             return False
     except Exception as e:
-        logger.error(f"Failed to initialize ICM20948: {e}")
+        logger.error("Failed to initialize ICM20948: %s", e)
         return False
 
 def read_byte(i2c_bus, addr, reg):
@@ -71,7 +71,7 @@ def read_byte(i2c_bus, addr, reg):
         try:
             return i2c_bus.read_byte_data(addr, reg)
         except Exception as e:
-            logger.debug(f"Error reading byte from address 0x{addr:02x}, register 0x{reg:02x}: {e}")
+            logger.debug("Error reading byte from address 0x%02x, register 0x%02x: %s", addr, reg, e)
             time.sleep(0.01)
-    logger.warning(f"Failed to read from address 0x{addr:02x}, register 0x{reg:02x} after {retries} retries")
+    logger.warning("Failed to read from address 0x%02x, register 0x%02x after %d retries", addr, reg, retries)
     return None
\ No newline at end of file
@@ -1,4 +1,5 @@
 import threading
+import queue
 import logging
 import signal
 import sys
@@ -6,12 +7,13 @@ import os
 import time
 import webbrowser
 import matplotlib.pyplot as plt
-from collections import deque  # Import deque
 
 from config import Config
+from buffers import RingBuffer, ScanBuffer
 from initialization import initialize_i2c, initialize_lidar, initialize_gps, initialize_icm20948
-from data_acquisition import lidar_thread_func, gps_thread_func, accel_thread_func
+from data_acquisition import lidar_thread_func, gps_thread_func, map_thread_func, accel_thread_func
 from visualization import setup_visualization
+from visualization_qt import setup_visualization_qt, run_visualization_qt, pyqtgraph_available
 from utils import update_gps_map, create_default_map
 
 # Fix Wayland error
@@ -26,25 +28,28 @@ class SensorFusion:
         self.config = Config()
         
         # Log user and session information
-        logger.info(f"Starting SensorFusion - User: {self.config.USER_LOGIN}, Session start: {self.config.SYSTEM_START_TIME}")
+        logger.info("Starting SensorFusion - User: %s, Session start: %s", self.config.USER_LOGIN, self.config.SYSTEM_START_TIME)
         
         # Data structures with thread safety
         self.lidar_data_lock = threading.Lock()
-        self.lidar_data = []
+        self.lidar_data = ScanBuffer(self.config.LIDAR_MAX_POINTS)
         
-        self.accel_data_lock = threading.Lock()
-        # Changed: Use deque instead of list
-        self.accel_data = deque(maxlen=self.config.MAX_DATA_POINTS)
+        # Preallocated ring buffer instead of a deque of Python floats. It has
+        # a single writer and is read lock-free (seqlock), so it needs no lock
+        self.accel_data = RingBuffer(self.config.MAX_DATA_POINTS)
         
         self.gps_data_lock = threading.Lock()
         # Changed: Update structure to match display.py
         self.gps_data = {"timestamp": None, "lat": 0, "lon": 0, "alt": 0, "sats": 0, "lock": self.gps_data_lock}
-        self.last_map_update = 0  # Added: Track last map update time
+        self.next_map_update = 0  # time.monotonic() deadline for the next map update
+        self.last_map_position = None  # Position (lat, lon) shown on the last map update
+        self.map_queue = queue.Queue(maxsize=1)  # Pending map updates for the map thread
         
         # Device handles
         self.lidar_device = None
         self.gps_serial_port = None
         self.i2c_bus = None
+        self.accel_available = False
         
         # Thread control
         self.stop_event = threading.Event()
@@ -55,9 +60,11 @@ class SensorFusion:
         self.fig_accel = None
         self.lidar_ani = None
         self.accel_ani = None
+        self.qt_window = None
+        self.qt_timer = None
         
         # Log the map file location
-        logger.info(f"GPS map will be saved to: {self.config.MAP_HTML_PATH}")
+        logger.info("GPS map will be saved to: %s", self.config.MAP_HTML_PATH)
 
     def initialize_devices(self):
         """Initialize all the devices"""
@@ -75,22 +82,29 @@ class SensorFusion:
         if not self.gps_serial_port:
             logger.warning("Failed to initialize GPS. Continuing without GPS.")
             
-        if not initialize_icm20948(self.i2c_bus, self.config):
+        # Remember the result so the accelerometer is not polled if it is missing
+        self.accel_available = initialize_icm20948(self.i2c_bus, self.config)
+        if not self.accel_available:
             logger.warning("Failed to initialize ICM20948. Continuing without accelerometer data.")
         
         return True
 
     def start_threads(self):
         """Start data acquisition threads"""
-        # Changed: Pass the last_map_update as an object attribute
+        # Changed: Pass the next_map_update as an object attribute
         self.threads = [
             threading.Thread(target=lidar_thread_func, args=(self.lidar_device, self.lidar_data_lock, self.lidar_data, self.stop_event, self.config), daemon=True),
             threading.Thread(target=gps_thread_func, 
                             args=(self.gps_serial_port, self.gps_data_lock, self.gps_data, 
-                                self.stop_event, self.config, update_gps_map, self), daemon=True),
-            threading.Thread(target=accel_thread_func, args=(self.i2c_bus, self.accel_data_lock, self.accel_data, self.stop_event, self.config), daemon=True)
+                                self.stop_event, self.config, self.map_queue, self), daemon=True),
+            threading.Thread(target=map_thread_func, args=(self.map_queue, self.stop_event, self.config, update_gps_map), daemon=True)
         ]
         
+        if self.accel_available:
+            self.threads.append(
+                threading.Thread(target=accel_thread_func, args=(self.i2c_bus, self.accel_data, self.stop_event, self.config), daemon=True)
+            )
+        
         for thread in self.threads:
             thread.start()
 
@@ -120,21 +134,21 @@ class SensorFusion:
                 self.lidar_device.stopmotor()
                 logger.info("LiDAR motor stopped")
             except Exception as e:
-                logger.error(f"Error stopping LiDAR motor: {e}")
+                logger.error("Error stopping LiDAR motor: %s", e)
                 
         if self.gps_serial_port:
             try:
                 self.gps_serial_port.close()
                 logger.info("GPS serial port closed")
             except Exception as e:
-                logger.error(f"Error closing GPS serial port: {e}")
+                logger.error("Error closing GPS serial port: %s", e)
                 
         if self.i2c_bus:
             try:
                 self.i2c_bus.close()
                 logger.info("I2C bus closed")
             except Exception as e:
-                logger.error(f"Error closing I2C bus: {e}")
+                logger.error("Error closing I2C bus: %s", e)
                 
         logger.info("Cleanup complete")
 
@@ -153,34 +167,53 @@ class SensorFusion:
         
         try:
             logger.info("Setting up visualization...")
-            self.fig_lidar, self.fig_accel, self.lidar_ani, self.accel_ani = setup_visualization(
-                self.lidar_data, self.lidar_data_lock, 
-                self.accel_data, self.accel_data_lock, 
-                self.config
-            )
+            qt_app = None
+            if self.config.VISUALIZATION_BACKEND == "pyqtgraph" and pyqtgraph_available():
+                qt_app, self.qt_window, self.qt_timer = setup_visualization_qt(
+                    self.lidar_data, self.lidar_data_lock, 
+                    self.accel_data, 
+                    self.config
+                )
+            else:
+                if self.config.VISUALIZATION_BACKEND == "pyqtgraph":
+                    logger.warning("pyqtgraph is not installed, falling back to matplotlib")
+                self.fig_lidar, self.fig_accel, self.lidar_ani, self.accel_ani = setup_visualization(
+                    self.lidar_data, self.lidar_data_lock, 
+                    self.accel_data, 
+                    self.config
+                )
             
             # Try to open the map in browser - Added this section
             try:
                 map_url = 'file://' + os.path.abspath(self.config.MAP_HTML_PATH)
-                logger.info(f"Opening map at: {map_url}")
+                logger.info("Opening map at: %s", map_url)
                 if webbrowser.open(map_url):
                     logger.info("Map opened in browser")
                 else:
                     logger.warning("Failed to open browser, but map file was created")
             except Exception as e:
-                logger.error(f"Error opening map in browser: {e}")
+                logger.error("Error opening map in browser: %s", e)
             
-            # Use plt.ioff() to avoid keeping windows always on top
-            plt.ioff()
-            # Show the figures but don't block
-            plt.show(block=False)
-            
-            # Keep the main thread alive but responsive to signals
-            while not self.stop_event.is_set():
-                plt.pause(0.1)  # Update plots while allowing other operations
+            if qt_app is not None:
+                # Block in the Qt event loop until the window is closed
+                run_visualization_qt(qt_app, self.stop_event)
+            else:
+                # Use plt.ioff() to avoid keeping windows always on top
+                plt.ioff()
+                # Show the figures but don't block
+                plt.show(block=False)
+                
+                # Keep the main thread alive but responsive to signals. Run the GUI
+                # event loop directly: plt.pause() would also re-show and redraw
+                # stale figures on every iteration, on top of the blitted animations
+                while not self.stop_event.is_set():
+                    if plt.get_fignums():
+                        plt.gcf().canvas.start_event_loop(0.1)
+                    else:
+                        self.stop_event.wait(0.1)
                 
-        except Exception as e:
-            logger.error(f"Error in visualization: {e}")
+        except Exception:
+            logger.exception("Error in visualization")
         finally:
             self.cleanup()
 
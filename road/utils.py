@@ -1,44 +1,31 @@
 import time
+import math
+import struct
 import folium
 import os
 import logging
 import webbrowser
+from smbus2 import i2c_msg
 
 logger = logging.getLogger("SensorFusion")
 
-def read_byte(i2c_bus, addr, reg):
-    """Read a byte from the I2C device"""
+def read_word_2c(i2c_bus, addr, reg):
+    """Read a 2's complement word from the I2C device"""
+    # Read the high and low bytes in one combined transaction instead of
+    # two separate byte reads
     retries = 3
     for _ in range(retries):
         try:
-            return i2c_bus.read_byte_data(addr, reg)
+            write = i2c_msg.write(addr, [reg])
+            read = i2c_msg.read(addr, 2)
+            i2c_bus.i2c_rdwr(write, read)
+            return struct.unpack('>h', bytes(read))[0]
         except Exception as e:
-            logger.debug(f"Error reading byte from address 0x{addr:02x}, register 0x{reg:02x}: {e}")
+            logger.debug("Error reading word from address 0x%02x, register 0x%02x: %s", addr, reg, e)
             time.sleep(0.01)
-    logger.warning(f"Failed to read from address 0x{addr:02x}, register 0x{reg:02x} after {retries} retries")
+    logger.warning("Failed to read from address 0x%02x, register 0x%02x after %d retries", addr, reg, retries)
     return None
 
-def read_word(i2c_bus, addr, reg):
-    """Read a word from the I2C device"""
-    high = read_byte(i2c_bus, addr, reg)
-    low = read_byte(i2c_bus, addr, reg + 1)
-    if high is not None and low is not None:
-        val = (high << 8) + low
-        return val
-    else:
-        return None
-
-def read_word_2c(i2c_bus, addr, reg):
-    """Read a 2's complement word from the I2C device"""
-    val = read_word(i2c_bus, addr, reg)
-    if val is not None:
-        if val >= 0x8000:
-            return -((65535 - val) + 1)
-        else:
-            return val
-    else:
-        return None
-
 def get_accel_data(i2c_bus, config):
     """Get accelerometer data from ICM20948"""
     accel_z = read_word_2c(i2c_bus, config.ICM20948_ADDRESS, config.ICM20948_ACCEL_ZOUT_H)
@@ -46,26 +33,24 @@ def get_accel_data(i2c_bus, config):
         return accel_z / 16384.0  # Convert to g
     return None
 
-def update_gps_map(gps_data, config):
-    """Update the GPS position on a Folium map and save as HTML"""
-    try:
-        with gps_data["lock"]:
-            lat = gps_data["lat"]
-            lon = gps_data["lon"]
-            alt = gps_data["alt"]
-            sats = gps_data["sats"]
-            timestamp = gps_data["timestamp"]
-        
-        # Skip if we don't have valid coordinates yet
-        if lat == 0 and lon == 0:
-            logger.warning("No valid GPS coordinates yet, skipping map update")
-            return
-                
-        # Create a map centered at the GPS coordinates
-        m = folium.Map(location=[lat, lon], zoom_start=config.MAP_ZOOM_START)
-        
-        # Add a marker for the current position
-        popup_text = f"""
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two GPS coordinates"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+# Placeholder fix used to render the GPS map page once; later updates only
+# substitute the current values into the cached HTML
+MAP_TEMPLATE_LAT = 12.3456789
+MAP_TEMPLATE_LON = -98.7654321
+MAP_TEMPLATE_POPUP = "__GPS_POPUP__"
+
+_gps_map_template = None
+
+# Popup HTML shared by every map update, filled in with str.format
+GPS_POPUP_HTML = """
         <b>GPS Data</b><br>
         Latitude: {lat:.6f}°<br>
         Longitude: {lon:.6f}°<br>
@@ -73,36 +58,100 @@ def update_gps_map(gps_data, config):
         Satellites: {sats}<br>
         Time: {timestamp}<br>
         <hr>
-        User: {config.USER_LOGIN}<br>
-        Session: {config.SYSTEM_START_TIME}
+        User: {user}<br>
+        Session: {session}
         """
+
+DEFAULT_MAP_POPUP_HTML = """
+        <b>Waiting for GPS data...</b><br>
+        <hr>
+        User: {user}<br>
+        Session: {session}
+        """
+
+def build_gps_map(lat, lon, popup_text, config):
+    """Create a Folium map showing a single GPS fix"""
+    # Create a map centered at the GPS coordinates
+    m = folium.Map(location=[lat, lon], zoom_start=config.MAP_ZOOM_START)
+    
+    # Add a marker for the current position
+    folium.Marker(
+        [lat, lon], 
+        popup=folium.Popup(popup_text, max_width=300)
+    ).add_to(m)
+    
+    # Add a circle to show accuracy (just for visualization)
+    folium.Circle(
+        location=[lat, lon],
+        radius=10,  # 10 meters radius
+        color='blue',
+        fill=True,
+        fill_opacity=0.2
+    ).add_to(m)
+    
+    return m
+
+def save_map_html(html, path):
+    """Write the map page atomically so a browser never loads a partly written file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+
+def get_gps_map_template(config):
+    """Render the GPS map page once with placeholder values and cache the HTML"""
+    global _gps_map_template
+    if _gps_map_template is None:
+        m = build_gps_map(MAP_TEMPLATE_LAT, MAP_TEMPLATE_LON, MAP_TEMPLATE_POPUP, config)
+        html = m.get_root().render()
         
-        folium.Marker(
-            [lat, lon], 
-            popup=folium.Popup(popup_text, max_width=300)
-        ).add_to(m)
+        # Fall back to rebuilding the map if the placeholders did not survive rendering
+        if all(str(value) in html for value in (MAP_TEMPLATE_LAT, MAP_TEMPLATE_LON, MAP_TEMPLATE_POPUP)):
+            _gps_map_template = html
+        else:
+            logger.warning("Map template placeholders not found, rebuilding the map on every update")
+            _gps_map_template = ""
+    return _gps_map_template
+
+def update_gps_map(gps_fix, config):
+    """Update the GPS position on a Folium map and save as HTML"""
+    try:
+        # gps_fix is a snapshot owned by the caller, so no lock is needed
+        lat = gps_fix["lat"]
+        lon = gps_fix["lon"]
+        alt = gps_fix["alt"]
+        sats = gps_fix["sats"]
+        timestamp = gps_fix["timestamp"]
         
-        # Add a circle to show accuracy (just for visualization)
-        folium.Circle(
-            location=[lat, lon],
-            radius=10,  # 10 meters radius
-            color='blue',
-            fill=True,
-            fill_opacity=0.2
-        ).add_to(m)
+        # Skip if we don't have valid coordinates yet
+        if lat == 0 and lon == 0:
+            logger.warning("No valid GPS coordinates yet, skipping map update")
+            return
         
-        # Save the map to an HTML file
-        m.save(config.MAP_HTML_PATH)
-        logger.info(f"GPS map updated at {config.MAP_HTML_PATH}")
+        popup_text = GPS_POPUP_HTML.format(
+            lat=lat, lon=lon, alt=alt, sats=sats, timestamp=timestamp,
+            user=config.USER_LOGIN, session=config.SYSTEM_START_TIME
+        )
+        
+        # Fill the cached page instead of rebuilding the whole Folium map
+        template = get_gps_map_template(config)
+        if template:
+            html = (template.replace(str(MAP_TEMPLATE_LAT), str(lat))
+                            .replace(str(MAP_TEMPLATE_LON), str(lon))
+                            .replace(MAP_TEMPLATE_POPUP, popup_text))
+        else:
+            html = build_gps_map(lat, lon, popup_text, config).get_root().render()
+        save_map_html(html, config.MAP_HTML_PATH)
+        logger.info("GPS map updated at %s", config.MAP_HTML_PATH)
         
         # Verify the file exists
         if os.path.exists(config.MAP_HTML_PATH):
-            logger.info(f"GPS map file successfully created")
+            logger.info("GPS map file successfully created")
         else:
-            logger.error(f"Failed to create GPS map file")
+            logger.error("Failed to create GPS map file")
             
-    except Exception as e:
-        logger.error(f"Error updating GPS map: {e}")
+    except Exception:
+        logger.exception("Error updating GPS map")
 
 def create_default_map(config):
     """Create a default map if no GPS data is available yet"""
@@ -111,12 +160,7 @@ def create_default_map(config):
         m = folium.Map(location=[0, 0], zoom_start=2)
         
         # Add explanatory text with user and session information
-        popup_text = f"""
-        <b>Waiting for GPS data...</b><br>
-        <hr>
-        User: {config.USER_LOGIN}<br>
-        Session: {config.SYSTEM_START_TIME}
-        """
+        popup_text = DEFAULT_MAP_POPUP_HTML.format(user=config.USER_LOGIN, session=config.SYSTEM_START_TIME)
         
         folium.Marker(
             [0, 0], 
@@ -125,8 +169,8 @@ def create_default_map(config):
         ).add_to(m)
         
         # Save the map
-        m.save(config.MAP_HTML_PATH)
-        logger.info(f"Default map created at {config.MAP_HTML_PATH}")
+        save_map_html(m.get_root().render(), config.MAP_HTML_PATH)
+        logger.info("Default map created at %s", config.MAP_HTML_PATH)
         
-    except Exception as e:
-        logger.error(f"Error creating default map: {e}")
+    except Exception:
+        logger.exception("Error creating default map")
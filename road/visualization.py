@@ -1,65 +1,77 @@
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from matplotlib.colors import Normalize
 import numpy as np
 import logging
 from datetime import datetime
 
 logger = logging.getLogger("SensorFusion")
 
-def update_lidar_plot(num, line, lidar_data, lidar_data_lock, config):
+def prepare_lidar_points(lidar_data, config):
+    """Convert the current LiDAR scan to polar plot coordinates (radians, distance)"""
+    # The acquisition thread already limited the scan to the field of view
+    # and stored the angles as -45..45 degrees
+    angles = lidar_data.angles
+    distances = lidar_data.distances
+    
+    # Thin out dense scans so the plot never draws more points than
+    # the axes can resolve
+    step = -(-len(distances) // config.LIDAR_MAX_PLOT_POINTS)
+    if step > 1:
+        angles = angles[::step]
+        distances = distances[::step]
+        
+    return np.radians(angles), distances
+
+def update_lidar_plot(num, line, lidar_data, lidar_data_lock, config, plot_state):
     """Update function for LiDAR animation"""
     with lidar_data_lock:
         if not lidar_data:
             return line,
-            
-        # Process the data for visualization - 
-        # Convert angles to the format expected by the polar plot
-        polar_data = []
-        for point in lidar_data:
-            angle_deg = point[0]
-            distance = point[1]
-            
-            # Convert 315-360 degrees to -45-0 degrees for the polar plot
-            if angle_deg >= 315 and angle_deg <= 360:
-                angle_deg = angle_deg - 360
-            
-            # Only include angles in our desired range
-            if -45 <= angle_deg <= 45:
-                polar_data.append((np.radians(angle_deg), distance))
         
-        if not polar_data:
+        # Nothing to recompute if no scan arrived since the last frame
+        if lidar_data.generation == plot_state["generation"]:
             return line,
+        plot_state["generation"] = lidar_data.generation
             
-        # Convert data to numpy arrays for faster processing
-        angles = np.array([point[0] for point in polar_data])
-        distances = np.array([point[1] for point in polar_data])
+        # Process the data for visualization
+        angles, distances = prepare_lidar_points(lidar_data, config)
+        if len(angles) == 0:
+            return line,
         
         # Update the plot
         offsets = np.column_stack((angles, distances))
         line.set_offsets(offsets)
         
-        # Color by intensity/distance
-        intensity = np.array([0 + (50 - 0) * (d / config.LIDAR_DMAX) for d in distances])
-        line.set_array(intensity)
+        # Color by distance; the scatter's norm scales it at draw time
+        line.set_array(distances)
         
     return line,
 
-def update_accel_plot(frame, accel_line, accel_data, accel_data_lock, config):
+def update_accel_plot(frame, accel_line, accel_data, config, plot_state):
     """Update function for accelerometer animation"""
-    with accel_data_lock:
-        if not accel_data:
-            return accel_line,
-            
-        # Update the plot with current data
-        data_array = np.array(accel_data)
-        accel_line.set_ydata(data_array)
+    # The ring buffer has a single writer, so a seqlock read is enough
+    # and the accelerometer thread never waits on the plot
+    if not accel_data:
+        return accel_line,
+    
+    # Nothing to update if no sample arrived since the last frame
+    count = accel_data.count
+    if count == plot_state["count"]:
+        return accel_line,
+    plot_state["count"] = count
+        
+    # Copy the samples into the preallocated y buffer. The x-axis is fixed
+    # at setup, so a partially filled buffer is padded with NaN (not drawn)
+    ydata = plot_state["ydata"]
+    n = accel_data.copy_into(ydata)
+    ydata[n:] = np.nan
         
-        # Adjust x-axis for proper scrolling effect
-        accel_line.set_xdata(np.arange(len(data_array)))
+    accel_line.set_ydata(ydata)
         
     return accel_line,
 
-def setup_visualization(lidar_data, lidar_data_lock, accel_data, accel_data_lock, config):
+def setup_visualization(lidar_data, lidar_data_lock, accel_data, config):
     """Set up matplotlib figures and animations"""
     # Set the matplotlib backend properties to allow window management
     # This works across different backends
@@ -93,11 +105,12 @@ def setup_visualization(lidar_data, lidar_data_lock, accel_data, accel_data_lock
                 fig_lidar.canvas.manager.window.wm_attributes("-topmost", 0)
             # For other backends, we rely on the default behavior
         
-        logger.info(f"Configured LiDAR visualization window using backend: {plt.get_backend()}")
+        logger.info("Configured LiDAR visualization window using backend: %s", plt.get_backend())
     except Exception as e:
-        logger.warning(f"Could not configure window manager for LiDAR plot: {e}")
+        logger.warning("Could not configure window manager for LiDAR plot: %s", e)
     
-    line = ax_lidar.scatter([0, 0], [0, 0], s=5, c=[0, 0], cmap=plt.cm.Greys_r, lw=0)
+    line = ax_lidar.scatter([0, 0], [0, 0], s=5, c=[0, 0], cmap=plt.cm.Greys_r, lw=0,
+                            norm=Normalize(vmin=0, vmax=config.LIDAR_DMAX))
     
     ax_lidar.set_rmax(1000)  # Set maximum distance to display
     
@@ -111,7 +124,7 @@ def setup_visualization(lidar_data, lidar_data_lock, accel_data, accel_data_lock
     lidar_ani = animation.FuncAnimation(
         fig_lidar, 
         update_lidar_plot,
-        fargs=(line, lidar_data, lidar_data_lock, config), 
+        fargs=(line, lidar_data, lidar_data_lock, config, {"generation": None}), 
         interval=config.UPDATE_INTERVAL, 
         blit=True,
         cache_frame_data=False
@@ -134,9 +147,9 @@ def setup_visualization(lidar_data, lidar_data_lock, accel_data, accel_data_lock
             elif 'tk' in backend:
                 fig_accel.canvas.manager.window.wm_attributes ("-topmost", 0)
         
-        logger.info(f"Configured accelerometer visualization window")
+        logger.info("Configured accelerometer visualization window")
     except Exception as e:
-        logger.warning(f"Could not configure window manager for accelerometer plot: {e}")
+        logger.warning("Could not configure window manager for accelerometer plot: %s", e)
     
     # Initialize with empty data
     accel_line, = ax_accel.plot(
@@ -164,7 +177,8 @@ def setup_visualization(lidar_data, lidar_data_lock, accel_data, accel_data_lock
     accel_ani = animation.FuncAnimation(
         fig_accel, 
         update_accel_plot, 
-        fargs=(accel_line, accel_data, accel_data_lock, config),
+        fargs=(accel_line, accel_data, config,
+               {"count": None, "ydata": np.full(config.MAX_DATA_POINTS, np.nan, dtype=np.float32)}),
         interval=config.UPDATE_INTERVAL, 
         blit=True,
         cache_frame_data=False
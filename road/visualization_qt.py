@@ -0,0 +1,113 @@
+import numpy as np
+import logging
+
+from visualization import prepare_lidar_points
+
+# pyqtgraph is optional; the matplotlib visualization is used without it
+try:
+    import pyqtgraph as pg
+    from pyqtgraph.Qt import QtCore
+except ImportError:
+    pg = None
+
+logger = logging.getLogger("SensorFusion")
+
+def pyqtgraph_available():
+    """Check whether the pyqtgraph backend can be used"""
+    return pg is not None
+
+def update_lidar_plot_qt(scatter, lidar_data, lidar_data_lock, config, plot_state):
+    """Update the LiDAR scatter with the latest scan"""
+    with lidar_data_lock:
+        # Nothing to redraw if no scan arrived since the last update
+        if not lidar_data or lidar_data.generation == plot_state["generation"]:
+            return
+        plot_state["generation"] = lidar_data.generation
+
+        angles, distances = prepare_lidar_points(lidar_data, config)
+
+        # Project the polar points to x (forward) / y (left) for the plot.
+        # distances is a view of the scan buffer, so this stays under the lock
+        x = distances * np.cos(angles)
+        y = distances * np.sin(angles)
+
+    scatter.setData(x, y)
+
+def update_accel_plot_qt(accel_curve, x_axis, accel_data, plot_state):
+    """Update the accelerometer curve with the buffered samples"""
+    # Lock-free seqlock read; the accelerometer thread is the only writer
+    if not accel_data or accel_data.count == plot_state["count"]:
+        return
+    plot_state["count"] = accel_data.count
+
+    # Copy the samples into the preallocated y buffer and plot the filled prefix
+    ydata = plot_state["ydata"]
+    n = accel_data.copy_into(ydata)
+    accel_curve.setData(x_axis[:n], ydata[:n])
+
+def setup_visualization_qt(lidar_data, lidar_data_lock, accel_data, config):
+    """Set up pyqtgraph plots and the timer that refreshes them"""
+    app = pg.mkQApp("SensorFusion")
+
+    # User info text for plot titles
+    user_info = f"User: {config.USER_LOGIN} | Session: {config.SYSTEM_START_TIME}"
+
+    window = pg.GraphicsLayoutWidget(title='LiDAR & Accelerometer Data - SensorFusion')
+    window.resize(800, 1000)
+
+    # LiDAR visualization - same 90° field of view as the matplotlib polar plot
+    lidar_plot = window.addPlot(title=f"LiDAR Data (90° FOV: 315°-360° and 0°-45°)<br>{user_info}")
+    lidar_plot.setAspectLocked(True)
+    lidar_plot.setXRange(0, 1000)
+    lidar_plot.setYRange(-1000, 1000)
+    lidar_plot.showGrid(x=True, y=True)
+    scatter = pg.ScatterPlotItem(size=5, pen=None, brush=pg.mkBrush(80, 80, 80))
+    lidar_plot.addItem(scatter)
+
+    # Accelerometer visualization
+    window.nextRow()
+    accel_plot = window.addPlot(title=f"Accelerometer Data<br>{user_info}")
+    accel_plot.setXRange(0, config.MAX_DATA_POINTS - 1)
+    accel_plot.setYRange(-2, 2)
+    accel_plot.setLabel('bottom', "Sample")
+    accel_plot.setLabel('left', "Acceleration (g)")
+    accel_plot.showGrid(x=True, y=True)
+    accel_plot.addLegend()
+    accel_curve = accel_plot.plot(pen='b', name='Acceleration (Z)')
+
+    window.show()
+
+    x_axis = np.arange(config.MAX_DATA_POINTS, dtype=np.float32)
+    lidar_state = {"generation": None}
+    accel_state = {"count": None, "ydata": np.zeros(config.MAX_DATA_POINTS, dtype=np.float32)}
+
+    def refresh():
+        update_lidar_plot_qt(scatter, lidar_data, lidar_data_lock, config, lidar_state)
+        update_accel_plot_qt(accel_curve, x_axis, accel_data, accel_state)
+
+    timer = QtCore.QTimer()
+    timer.timeout.connect(refresh)
+    timer.start(config.UPDATE_INTERVAL)
+
+    logger.info("Configured pyqtgraph visualization window")
+    return app, window, timer
+
+def run_visualization_qt(app, stop_event):
+    """Run the Qt event loop until the window is closed or stop_event is set"""
+    # Qt's event loop does not hand control back to Python on its own, so a
+    # periodic no-op timer lets the SIGINT handler run; it also quits once
+    # stop_event has been set elsewhere
+    def check_stop():
+        if stop_event.is_set():
+            app.quit()
+
+    wake_timer = QtCore.QTimer()
+    wake_timer.timeout.connect(check_stop)
+    wake_timer.start(200)
+
+    # Closing the window quits the application, which stops acquisition
+    app.setQuitOnLastWindowClosed(True)
+    app.aboutToQuit.connect(stop_event.set)
+
+    pg.exec()
+    wake_timer.stop()